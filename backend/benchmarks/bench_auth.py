@@ -0,0 +1,109 @@
+"""Benchmark get_current_user: database lookup vs. profile claim fast path.
+
+By default `db.users` is replaced with an in-memory stand-in whose find_one
+sleeps for --db-latency-ms, so the script runs without any infrastructure.
+Pass --real-mongo to use the MongoDB configured in backend/.env instead
+(a temporary user is inserted and removed again).
+
+    python benchmarks/bench_auth.py --iterations 2000 --db-latency-ms 0.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('JWT_EMBED_PROFILE', 'true')
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+import server  # noqa: E402
+
+
+class InMemoryUsers:
+    """Just enough of a Motor collection for get_current_user"""
+
+    def __init__(self, latency_ms: float):
+        self.latency_seconds = latency_ms / 1000
+        self.documents = {}
+        self.calls = 0
+
+    async def insert_one(self, document: dict):
+        self.documents[document["id"]] = dict(document)
+
+    async def delete_one(self, query: dict):
+        self.documents.pop(query["id"], None)
+
+    async def find_one(self, query: dict, projection: dict = None):
+        self.calls += 1
+        await asyncio.sleep(self.latency_seconds)
+        document = self.documents.get(query["id"])
+        if document is None:
+            return None
+        excluded = {key for key, value in (projection or {}).items() if not value}
+        return {key: value for key, value in document.items() if key not in excluded}
+
+
+async def time_auth(token: str, iterations: int) -> float:
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    await server.get_current_user(credentials)  # warm up connection and caches
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await server.get_current_user(credentials)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def main(iterations: int, real_mongo: bool, db_latency_ms: float):
+    users = None
+    if not real_mongo:
+        users = InMemoryUsers(db_latency_ms)
+        server.db = SimpleNamespace(users=users)
+
+    user = server.User(
+        email=f"bench_{int(time.time())}@example.com",
+        name="Bench User",
+        birth_date=date(1990, 5, 15),
+        birth_time="14:30",
+        birth_place="New York, USA",
+        zodiac_sign="Taurus"
+    )
+    user_dict = user.model_dump()
+    user_dict["birth_date"] = user_dict["birth_date"].isoformat()
+    user_dict["password"] = "not-a-hash"
+    await server.db.users.insert_one(dict(user_dict))
+
+    try:
+        server.JWT_EMBED_PROFILE = False
+        db_token = server.create_access_token(user.id, user_dict)
+        server.JWT_EMBED_PROFILE = True
+        claim_token = server.create_access_token(user.id, user_dict)
+
+        db_us = await time_auth(db_token, iterations)
+        lookups_before = users.calls if users else 0
+        claim_us = await time_auth(claim_token, iterations)
+        claim_lookups = (users.calls - lookups_before) if users else None
+    finally:
+        await server.db.users.delete_one({"id": user.id})
+        server.client.close()
+
+    print(f"backend:             {'MongoDB' if real_mongo else f'in-memory, {db_latency_ms} ms per find_one'}")
+    print(f"iterations:          {iterations}")
+    print(f"database lookup:     {db_us:10.1f} us/request")
+    print(f"profile claim:       {claim_us:10.1f} us/request")
+    print(f"speedup:             {db_us / claim_us:10.1f}x")
+    if claim_lookups is not None:
+        print(f"claim path lookups:  {claim_lookups:10d} (token version cache hits otherwise)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--real-mongo", action="store_true", help="Use the MongoDB from backend/.env")
+    parser.add_argument("--db-latency-ms", type=float, default=0.5,
+                        help="Simulated find_one round trip for the in-memory stand-in")
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations, args.real_mongo, args.db_latency_ms))
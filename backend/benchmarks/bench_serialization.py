@@ -0,0 +1,129 @@
+"""Per-route serialization and validation CPU: FastAPI defaults vs. fast path.
+
+"before" rebuilds models with validation, runs them through jsonable_encoder
+and renders a JSONResponse, as the handlers did previously. "after" builds each
+model once and renders an ORJSONResponse directly, skipping the second
+response_model validation pass and jsonable_encoder.
+No database or network access is needed.
+
+    python benchmarks/bench_serialization.py --iterations 20000
+"""
+import argparse
+import sys
+import timeit
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+
+import server  # noqa: E402
+
+USER_DOC = {
+    "id": "0b7f3c1e-4d4a-4c1b-9d53-6f0f2f7d2a11",
+    "email": "bench@example.com",
+    "name": "Bench User",
+    "birth_date": date(1990, 5, 15),
+    "birth_time": "14:30",
+    "birth_place": "New York, USA",
+    "zodiac_sign": "Taurus",
+    "created_at": datetime(2024, 1, 1, 12, 0, 0)
+}
+# Roughly the response lengths each prompt asks for
+READINGS = {
+    "horoscope_daily": "Your daily horoscope suggests that today is an excellent day for new beginnings. " * 14,
+    "compatibility_analyze": (
+        "Compatibility Analysis: 78% Match. Strengths: communication, shared values, "
+        "complementary personalities. Challenges: different approaches to money. "
+    ) * 12,
+    "friends_advice": "For Alex: use more humor. For Jordan: be patient with their analytical nature. " * 11
+}
+
+
+def login_before():
+    content = {
+        "access_token": "token",
+        "refresh_token": "token",
+        "token_type": "bearer",
+        "user": {key: USER_DOC[key] for key in ("id", "email", "name", "zodiac_sign")}
+    }
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def login_after():
+    return server.fast_response(server.AuthResponse(
+        access_token="token",
+        refresh_token="token",
+        token_type="bearer",
+        user=server.AuthUser(
+            **{key: USER_DOC[key] for key in ("id", "email", "name", "zodiac_sign")}
+        )
+    )).body
+
+
+def reading_before(content: str, tone: str):
+    def run():
+        response = server.AIResponse(content=content, tone=tone)
+        # FastAPI re-validates the return value against response_model
+        validated = server.AIResponse.model_validate(response.model_dump())
+        return JSONResponse(jsonable_encoder(validated)).body
+    return run
+
+
+def reading_after(content: str, tone: str):
+    def run():
+        return server.fast_response(server.AIResponse(content=content, tone=tone)).body
+    return run
+
+
+def refresh_before():
+    return JSONResponse(jsonable_encoder({"access_token": "token", "token_type": "bearer"})).body
+
+
+def refresh_after():
+    return server.fast_response(server.RefreshResponse(access_token="token", token_type="bearer")).body
+
+
+def profile_before():
+    user = server.User(**USER_DOC)
+    content = {key: getattr(user, key) for key in server.ProfileResponse.model_fields if key != "access_token"}
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def profile_after():
+    user = server.User(**USER_DOC)
+    content = {key: getattr(user, key) for key in server.ProfileResponse.model_fields if key != "access_token"}
+    return ORJSONResponse(content).body
+
+
+CASES = [
+    ("POST /api/auth/login", login_before, login_after),
+    ("POST /api/auth/refresh", refresh_before, refresh_after),
+    ("POST /api/horoscope/daily",
+     reading_before(READINGS["horoscope_daily"], "serious"),
+     reading_after(READINGS["horoscope_daily"], "serious")),
+    ("POST /api/compatibility/analyze",
+     reading_before(READINGS["compatibility_analyze"], "humorous"),
+     reading_after(READINGS["compatibility_analyze"], "humorous")),
+    ("POST /api/friends/advice",
+     reading_before(READINGS["friends_advice"], "soul"),
+     reading_after(READINGS["friends_advice"], "soul")),
+    ("GET  /api/profile", profile_before, profile_after),
+]
+
+
+def main(iterations: int):
+    print(f"{'route':36} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for name, before, after in CASES:
+        before_us = min(timeit.repeat(before, number=iterations, repeat=3)) / iterations * 1e6
+        after_us = min(timeit.repeat(after, number=iterations, repeat=3)) / iterations * 1e6
+        print(f"{name:36} {before_us:10.2f} {after_us:10.2f} {before_us / after_us:7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.iterations)
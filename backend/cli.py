@@ -0,0 +1,92 @@
+"""Command line tools for bulk data movement.
+
+    python cli.py export users users.ndjson.gz
+    python cli.py import readings readings.ndjson --offset 250000
+"""
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+import typer
+
+import server
+
+app = typer.Typer(help="AstroMind data export/import")
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+async def iter_file_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as source:
+        while True:
+            chunk = source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def check_collection(collection: str) -> str:
+    if collection not in server.BULK_COLLECTIONS:
+        raise typer.BadParameter(f"expected one of: {', '.join(server.BULK_COLLECTIONS)}")
+    return collection
+
+
+@app.command("export")
+def export_command(
+    collection: str = typer.Argument(..., callback=check_collection),
+    output: Path = typer.Argument(..., help="Destination file; a .gz suffix enables gzip"),
+    batch_size: int = typer.Option(server.EXPORT_BATCH_SIZE, help="Documents per cursor batch")
+):
+    """Stream a collection to an NDJSON file (user password hashes are never exported)."""
+    async def run():
+        written = 0
+        with output.open("wb") as destination:
+            chunks = server.iter_export_chunks(collection, compress=output.suffix == ".gz", batch_size=batch_size)
+            async for chunk in chunks:
+                destination.write(chunk)
+                written += len(chunk)
+        return written
+
+    try:
+        written = asyncio.run(run())
+    finally:
+        server.client.close()
+    typer.echo(f"Exported {collection} to {output} ({written} bytes)")
+
+
+@app.command("import")
+def import_command(
+    collection: str = typer.Argument(..., callback=check_collection),
+    source: Path = typer.Argument(..., exists=True, dir_okay=False, help="NDJSON file, plain or gzip"),
+    offset: int = typer.Option(0, min=0, help="Documents to skip, e.g. next_offset of a failed run"),
+    batch_size: int = typer.Option(server.IMPORT_BATCH_SIZE, help="Documents per bulk_write"),
+    concurrency: int = typer.Option(server.IMPORT_CONCURRENCY, help="Bulk writes in flight")
+):
+    """Upsert documents from an NDJSON file using unordered bulk writes."""
+    async def run():
+        # Without the unique `id` index every upsert is a collection scan
+        await server.ensure_indexes()
+        return await server.import_ndjson(
+            collection,
+            server.iter_ndjson_lines(iter_file_chunks(source)),
+            offset=offset,
+            batch_size=batch_size,
+            concurrency=concurrency
+        )
+
+    try:
+        result = asyncio.run(run())
+    except server.BulkImportError as e:
+        typer.echo(f"Import failed: {e}", err=True)
+        typer.echo(f"Resume with: --offset {e.progress['next_offset']}", err=True)
+        raise typer.Exit(code=1)
+    finally:
+        server.client.close()
+    typer.echo(
+        f"Imported {collection}: {result['upserted']} inserted, {result['modified']} updated, "
+        f"next offset {result['next_offset']}"
+    )
+
+
+if __name__ == "__main__":
+    app()
@@ -1,13 +1,25 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, OperationFailure
 import os
 import logging
+import math
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from pathlib import Path
+import numpy as np
+import orjson
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import uuid
 from datetime import datetime, date, timedelta
 import bcrypt
@@ -22,9 +34,122 @@ load_dotenv(ROOT_DIR / '.env')
 # Real production mode - use actual Azure OpenAI
 os.environ['TESTING_MODE'] = 'false'
 
+def optional_int_env(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+# MongoDB connection pool configuration
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_CONNECTING = int(os.environ.get('MONGO_MAX_CONNECTING', '2'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '20000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = optional_int_env('MONGO_WAIT_QUEUE_TIMEOUT_MS')
+MONGO_SOCKET_TIMEOUT_MS = optional_int_env('MONGO_SOCKET_TIMEOUT_MS')
+MONGO_MAX_IDLE_TIME_MS = optional_int_env('MONGO_MAX_IDLE_TIME_MS')
+
+# Warm-up and readiness configuration
+MONGO_WARMUP_CONNECTIONS = int(os.environ.get('MONGO_WARMUP_CONNECTIONS', '10'))
+MONGO_WARMUP_TIMEOUT_SECONDS = float(os.environ.get('MONGO_WARMUP_TIMEOUT_SECONDS', '10'))
+LLM_WARMUP_CONNECTIONS = int(os.environ.get('LLM_WARMUP_CONNECTIONS', '4'))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', '100'))
+# Idle LLM connections must outlive the gap between readiness and first traffic
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get('LLM_KEEPALIVE_EXPIRY_SECONDS', '300'))
+READINESS_MAX_POOL_SATURATION = float(os.environ.get('READINESS_MAX_POOL_SATURATION', '0.9'))
+READINESS_PING_TIMEOUT_SECONDS = float(os.environ.get('READINESS_PING_TIMEOUT_SECONDS', '1'))
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks Motor connection pool usage from PyMongo's CMAP events"""
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self.lock = threading.Lock()
+        self.pools = set()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+
+    def _add(self, attribute: str, amount: int):
+        # Events fire on the driver's executor threads
+        with self.lock:
+            setattr(self, attribute, getattr(self, attribute) + amount)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            capacity = self.max_pool_size * max(1, len(self.pools))
+            return {
+                "max_pool_size": self.max_pool_size,
+                "pools": len(self.pools),
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "checkout_failures": self.checkout_failures,
+                "saturation": self.checked_out / capacity if self.max_pool_size else 0.0
+            }
+
+    def pool_created(self, event):
+        with self.lock:
+            self.pools.add(event.address)
+
+    def pool_closed(self, event):
+        with self.lock:
+            self.pools.discard(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._add("open", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add("open", -1)
+
+    def connection_check_out_started(self, event):
+        self._add("waiting", 1)
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self.lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self._add("checked_out", -1)
+
+pool_monitor = PoolMonitor(MONGO_MAX_POOL_SIZE)
+
+# The driver keeps minPoolSize connections open in the background, which is
+# what actually pre-opens (and keeps) the warm-up connections. A max pool size
+# of 0 means unlimited in PyMongo.
+if MONGO_MAX_POOL_SIZE:
+    MONGO_WARMUP_CONNECTIONS = min(MONGO_WARMUP_CONNECTIONS, MONGO_MAX_POOL_SIZE)
+MONGO_EFFECTIVE_MIN_POOL_SIZE = max(MONGO_MIN_POOL_SIZE, MONGO_WARMUP_CONNECTIONS)
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_EFFECTIVE_MIN_POOL_SIZE,
+    maxConnecting=MONGO_MAX_CONNECTING,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    event_listeners=[pool_monitor]
+)
 db = client[os.environ['DB_NAME']]
 
 # Azure OpenAI Configuration
@@ -42,11 +167,187 @@ os.environ["AZURE_DEPLOYMENT_NAME"] = AZURE_OPENAI_DEPLOYMENT
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-here')
 JWT_ALGORITHM = "HS256"
 
+# Embed a compact profile claim in access tokens so AI routes can authenticate
+# without a database lookup. Access tokens are short-lived when enabled and
+# clients renew them through /api/auth/refresh.
+JWT_EMBED_PROFILE = os.environ.get('JWT_EMBED_PROFILE', 'false').lower() == 'true'
+PROFILE_CLAIM_VERSION = 1
+ACCESS_TOKEN_TTL_MINUTES = int(os.environ.get(
+    'ACCESS_TOKEN_TTL_MINUTES', '15' if JWT_EMBED_PROFILE else str(7 * 24 * 60)
+))
+REFRESH_TOKEN_TTL_DAYS = int(os.environ.get('REFRESH_TOKEN_TTL_DAYS', '30'))
+TOKEN_VERSION_CACHE_TTL_SECONDS = float(os.environ.get('TOKEN_VERSION_CACHE_TTL_SECONDS', '30'))
+
+# Rate limiting configuration (token bucket per user and route)
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')  # memory, mongo
+RATE_LIMIT_CAPACITY = float(os.environ.get('RATE_LIMIT_CAPACITY', '10'))
+# 0 disables refill: each bucket is a fixed quota of RATE_LIMIT_CAPACITY calls
+RATE_LIMIT_REFILL_PER_SECOND = float(os.environ.get('RATE_LIMIT_REFILL_PER_SECOND', '0.1'))
+if RATE_LIMIT_REFILL_PER_SECOND < 0:
+    raise ValueError("RATE_LIMIT_REFILL_PER_SECOND must be >= 0")
+
+# Usage accounting configuration
+USAGE_FLUSH_INTERVAL_SECONDS = float(os.environ.get('USAGE_FLUSH_INTERVAL_SECONDS', '30'))
+# Raw call records kept for retry when MongoDB is unavailable; oldest are dropped first
+USAGE_MAX_PENDING = int(os.environ.get('USAGE_MAX_PENDING', '100000'))
+
+# Persist generated readings for export and analytics (buffered, written in the background)
+STORE_READINGS = os.environ.get('STORE_READINGS', 'true').lower() == 'true'
+READINGS_FLUSH_INTERVAL_SECONDS = float(os.environ.get('READINGS_FLUSH_INTERVAL_SECONDS', '5'))
+READINGS_MAX_PENDING = int(os.environ.get('READINGS_MAX_PENDING', '10000'))
+
+# Near-duplicate reading reuse (off by default)
+SEMANTIC_REUSE_ENABLED = os.environ.get('SEMANTIC_REUSE_ENABLED', 'false').lower() == 'true'
+SEMANTIC_REUSE_THRESHOLD = float(os.environ.get('SEMANTIC_REUSE_THRESHOLD', '0.98'))
+SEMANTIC_REUSE_CAPACITY = int(os.environ.get('SEMANTIC_REUSE_CAPACITY', '5000'))
+SEMANTIC_REUSE_DISABLED_ROUTES = {
+    route.strip()
+    for route in os.environ.get('SEMANTIC_REUSE_DISABLED_ROUTES', '').split(',')
+    if route.strip()
+}
+
+# Request tracing configuration
+TRACE_EXPORT = os.environ.get('TRACE_EXPORT', '')  # '', file, otlp
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH', str(ROOT_DIR / 'traces.ndjson'))
+TRACE_OTLP_ENDPOINT = os.environ.get('TRACE_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACE_EXPORT_INTERVAL_SECONDS = float(os.environ.get('TRACE_EXPORT_INTERVAL_SECONDS', '5'))
+TRACE_SLOW_REQUEST_MS = float(os.environ.get('TRACE_SLOW_REQUEST_MS', '2000'))
+TRACE_SLOW_BUFFER_SIZE = int(os.environ.get('TRACE_SLOW_BUFFER_SIZE', '100'))
+
+# Bulk export/import configuration
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+IMPORT_CONCURRENCY = int(os.environ.get('IMPORT_CONCURRENCY', '4'))
+
+ADMIN_EMAILS = {
+    email.strip().lower()
+    for email in os.environ.get('ADMIN_EMAILS', '').split(',')
+    if email.strip()
+}
+
 # Security
 security = HTTPBearer()
 
+# Startup warm-up
+warmup_state = {"complete": False, "mongo_connections": 0, "llm_connections": 0, "duration_ms": 0.0}
+llm_http_client = None
+
+async def warm_up_mongo(connections: int) -> int:
+    """Wait until the pool has opened `connections` sockets; returns the open count"""
+    try:
+        # Server selection; the driver then fills the pool up to minPoolSize
+        await db.command("ping")
+    except Exception as e:
+        logger.warning(f"Mongo warm-up ping failed: {e}")
+        return pool_monitor.open
+
+    deadline = time.monotonic() + MONGO_WARMUP_TIMEOUT_SECONDS
+    while pool_monitor.open < connections and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if pool_monitor.open < connections:
+        logger.warning(f"Mongo warm-up: {pool_monitor.open} of {connections} connections open after timeout")
+    return pool_monitor.open
+
+async def warm_up_llm(connections: int) -> int:
+    """Give LiteLLM a shared HTTP pool and pre-establish TLS to the Azure endpoint"""
+    global llm_http_client
+    try:
+        import httpx
+        import litellm
+    except ImportError:
+        return 0
+
+    llm_http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        timeout=httpx.Timeout(60.0, connect=10.0)
+    )
+    litellm.aclient_session = llm_http_client
+
+    # Any HTTP response means the connection (DNS, TCP, TLS) is now pooled
+    results = await asyncio.gather(
+        *(llm_http_client.get(AZURE_OPENAI_ENDPOINT) for _ in range(connections)),
+        return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning(f"LLM warm-up: {len(failures)} of {len(results)} requests failed: {failures[0]}")
+    return len(results) - len(failures)
+
+async def ensure_unique_index(collection, field: str):
+    try:
+        await collection.create_index(field, unique=True)
+    except OperationFailure as e:
+        # 85/86: an older non-unique index with the same key or name exists
+        if e.code not in (85, 86):
+            raise
+        await collection.drop_index(f"{field}_1")
+        await collection.create_index(field, unique=True)
+
+async def ensure_indexes():
+    """Create the indexes the API and bulk import rely on; safe to call repeatedly"""
+    await db.usage.create_index([("user_id", 1), ("created_at", -1)])
+    await db.usage_rollups.create_index("day")
+    # Lookups and import upserts match on `id`; unique keeps concurrent upserts from duplicating
+    await ensure_unique_index(db.users, "id")
+    await ensure_unique_index(db.readings, "id")
+    await db.readings.create_index([("user_id", 1), ("generated_at", -1)])
+
+async def warm_up():
+    """Create indexes and pre-open connections; readiness stays false until done"""
+    started = time.perf_counter()
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not create indexes: {e}")
+
+    mongo_connections, llm_connections = await asyncio.gather(
+        warm_up_mongo(MONGO_WARMUP_CONNECTIONS),
+        warm_up_llm(LLM_WARMUP_CONNECTIONS)
+    )
+    warmup_state.update(
+        complete=True,
+        mongo_connections=mongo_connections,
+        llm_connections=llm_connections,
+        duration_ms=(time.perf_counter() - started) * 1000
+    )
+    logger.info(f"Warm-up complete: {warmup_state}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Run in the background so /healthz and /readyz answer while warming up
+    warm_up_task = asyncio.create_task(warm_up())
+    usage_flush_task = asyncio.create_task(usage_recorder.run(USAGE_FLUSH_INTERVAL_SECONDS))
+    trace_export_task = asyncio.create_task(trace_recorder.run(TRACE_EXPORT_INTERVAL_SECONDS))
+    readings_flush_task = asyncio.create_task(reading_recorder.run(READINGS_FLUSH_INTERVAL_SECONDS))
+    yield
+
+    warm_up_task.cancel()
+    usage_flush_task.cancel()
+    trace_export_task.cancel()
+    readings_flush_task.cancel()
+    try:
+        await usage_recorder.flush()
+    except Exception as e:
+        logger.warning(f"Final usage flush failed: {e}")
+    try:
+        await reading_recorder.flush()
+    except Exception as e:
+        logger.warning(f"Final readings flush failed: {e}")
+    try:
+        await trace_recorder.flush()
+    except Exception as e:
+        logger.warning(f"Final trace export failed: {e}")
+    await trace_recorder.close()
+    if llm_http_client is not None:
+        await llm_http_client.aclose()
+    client.close()
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -64,6 +365,9 @@ class UserLogin(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     email: str
@@ -92,6 +396,43 @@ class AIResponse(BaseModel):
     tone: str
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class AuthUser(BaseModel):
+    id: str
+    email: str
+    name: str
+    zodiac_sign: str
+
+class AuthResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+    user: AuthUser
+
+class RefreshResponse(BaseModel):
+    access_token: str
+    token_type: str
+
+class RevokeResponse(BaseModel):
+    revoked: bool
+
+class ProfileResponse(BaseModel):
+    id: str
+    email: str
+    name: str
+    birth_date: date
+    birth_time: str
+    birth_place: str
+    zodiac_sign: str
+    access_token: Optional[str] = None
+
+def fast_response(model: BaseModel) -> ORJSONResponse:
+    """Serialize a model built by the handler itself.
+
+    Returning a Response skips FastAPI's second validation pass against
+    response_model and jsonable_encoder; orjson handles date/datetime natively.
+    """
+    return ORJSONResponse(model.model_dump())
+
 # Astrology helper functions
 def calculate_zodiac_sign(birth_date: date) -> str:
     """Calculate zodiac sign from birth date"""
@@ -123,6 +464,55 @@ def calculate_zodiac_sign(birth_date: date) -> str:
     else:
         return "Capricorn"
 
+ZODIAC_SIGNS = [
+    "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
+    "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
+]
+ELEMENTS = ["Fire", "Earth", "Air", "Water"]
+
+def get_element(zodiac_sign: str) -> str:
+    """Signs cycle through the elements in order: Aries fire, Taurus earth, ..."""
+    return ELEMENTS[ZODIAC_SIGNS.index(zodiac_sign) % 4]
+
+def birth_details_key(birth_date: date, birth_place: str) -> str:
+    """Exact-match part of a reuse bucket.
+
+    Prompts quote the birth date and place verbatim, so a reused reading may
+    repeat them; only the birth time is left to the similarity search.
+    """
+    return f"{birth_date.isoformat()}@{' '.join(birth_place.lower().split())}"
+
+def chart_features(zodiac_sign: str, birth_date: date, birth_time: str) -> np.ndarray:
+    """Cheap numeric summary of a birth chart for similarity search.
+
+    Sign and element are one-hot; birth time (a stand-in for the ascendant)
+    and day of year are encoded as points on a circle so that 23:50 and 00:10
+    come out close together.
+    """
+    sign = np.zeros(12, dtype=np.float32)
+    element = np.zeros(4, dtype=np.float32)
+    if zodiac_sign in ZODIAC_SIGNS:
+        sign[ZODIAC_SIGNS.index(zodiac_sign)] = 1.0
+        element[ELEMENTS.index(get_element(zodiac_sign))] = 0.5
+
+    time_angle = None
+    try:
+        hours, minutes = birth_time.split(":")[:2]
+        time_angle = (int(hours) * 60 + int(minutes)) / 1440 * 2 * math.pi
+    except (ValueError, AttributeError):
+        pass
+    time_point = [0.0, 0.0] if time_angle is None else [math.cos(time_angle), math.sin(time_angle)]
+
+    day_angle = birth_date.timetuple().tm_yday / 366 * 2 * math.pi
+    day_point = [math.cos(day_angle), math.sin(day_angle)]
+
+    return np.concatenate([
+        sign,
+        element,
+        0.5 * np.array(time_point, dtype=np.float32),
+        0.5 * np.array(day_point, dtype=np.float32)
+    ])
+
 def get_tone_instructions(tone: str) -> str:
     """Get AI tone instructions"""
     tones = {
@@ -189,6 +579,627 @@ class MockLlmChat:
         else:
             return "This is a mock response for testing purposes. In production, this would be generated by Azure OpenAI."
 
+# Request tracing
+current_trace: ContextVar[Optional["Trace"]] = ContextVar("current_trace", default=None)
+current_span_id: ContextVar[Optional[str]] = ContextVar("current_span_id", default=None)
+
+class Trace:
+    def __init__(self, method: str, path: str):
+        self.trace_id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.start_ns = time.time_ns()
+        self.duration_ms = 0.0
+        self.status_code = 0
+        self.spans: List[dict] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "start_time": datetime.utcfromtimestamp(self.start_ns / 1e9),
+            "duration_ms": self.duration_ms,
+            "spans": self.spans
+        }
+
+class Span:
+    def __init__(self, trace: Trace, name: str, attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_span_id = current_span_id.get()
+        self.start_ns = time.time_ns()
+        self.started = time.perf_counter_ns()
+        self.token = current_span_id.set(self.span_id)
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self):
+        if self.token is None:
+            return
+        duration_ns = time.perf_counter_ns() - self.started
+        current_span_id.reset(self.token)
+        self.token = None
+        self.trace.spans.append({
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.start_ns + duration_ns,
+            "duration_ms": duration_ns / 1e6,
+            "status": self.status,
+            "attributes": self.attributes
+        })
+
+class NoopSpan:
+    status = "ok"
+
+    def set_attribute(self, key: str, value):
+        pass
+
+    def end(self):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+def start_span(name: str, **attributes):
+    """Open a child span of the current one; call .end() to close it"""
+    trace = current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return Span(trace, name, attributes)
+
+@contextmanager
+def span(name: str, **attributes):
+    current = start_span(name, **attributes)
+    try:
+        yield current
+    except BaseException:
+        current.status = "error"
+        raise
+    finally:
+        current.end()
+
+class FileTraceExporter:
+    """Appends finished traces to a local NDJSON file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, payload: bytes):
+        with open(self.path, "ab") as destination:
+            destination.write(payload)
+
+    async def close(self):
+        pass
+
+    async def export(self, traces: List[dict]):
+        payload = b"".join(orjson.dumps(trace, option=orjson.OPT_APPEND_NEWLINE) for trace in traces)
+        await asyncio.get_running_loop().run_in_executor(None, self._write, payload)
+
+class OtlpTraceExporter:
+    """Posts traces as OTLP/HTTP JSON to a collector (or any stand-in accepting it)"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        # Created on first export, inside the running event loop
+        self.http = None
+
+    async def close(self):
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    @staticmethod
+    def to_otlp_span(trace: dict, span_data: dict) -> dict:
+        attributes = [{"key": "http.route", "value": {"stringValue": trace["path"]}}]
+        attributes += [
+            {"key": key, "value": {"stringValue": str(value)}}
+            for key, value in span_data["attributes"].items()
+        ]
+        otlp_span = {
+            "traceId": trace["trace_id"],
+            "spanId": span_data["span_id"],
+            "name": span_data["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(span_data["start_ns"]),
+            "endTimeUnixNano": str(span_data["end_ns"]),
+            "attributes": attributes,
+            "status": {"code": 2 if span_data["status"] == "error" else 1}
+        }
+        if span_data["parent_span_id"]:
+            otlp_span["parentSpanId"] = span_data["parent_span_id"]
+        return otlp_span
+
+    async def export(self, traces: List[dict]):
+        spans = [self.to_otlp_span(trace, span_data) for trace in traces for span_data in trace["spans"]]
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "astromind-backend"}}]},
+            "scopeSpans": [{"scope": {"name": "server"}, "spans": spans}]
+        }]}
+        if self.http is None:
+            import httpx
+            self.http = httpx.AsyncClient(timeout=5.0)
+        response = await self.http.post(
+            self.endpoint, content=orjson.dumps(payload), headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+def create_trace_exporter(name: str):
+    if name == "file":
+        return FileTraceExporter(TRACE_EXPORT_PATH)
+    if name == "otlp":
+        return OtlpTraceExporter(TRACE_OTLP_ENDPOINT)
+    return None
+
+class TraceRecorder:
+    """Keeps slow requests in a ring buffer and batches traces for export"""
+
+    def __init__(self, exporter, slow_request_ms: float, slow_buffer_size: int):
+        self.exporter = exporter
+        self.slow_request_ms = slow_request_ms
+        self.slow_traces = deque(maxlen=slow_buffer_size)
+        self.pending: List[dict] = []
+
+    def record(self, trace: Trace):
+        if self.exporter is None and trace.duration_ms < self.slow_request_ms:
+            return
+        trace_dict = trace.to_dict()
+        if trace.duration_ms >= self.slow_request_ms:
+            self.slow_traces.append(trace_dict)
+        if self.exporter is not None:
+            self.pending.append(trace_dict)
+
+    async def flush(self):
+        if self.exporter is None or not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        await self.exporter.export(pending)
+
+    async def close(self):
+        if self.exporter is not None:
+            await self.exporter.close()
+
+    async def run(self, interval: float):
+        """Export loop started on application startup"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+trace_recorder = TraceRecorder(
+    create_trace_exporter(TRACE_EXPORT), TRACE_SLOW_REQUEST_MS, TRACE_SLOW_BUFFER_SIZE
+)
+
+# LLM usage accounting
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about 4 characters per token for English text)"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+class BufferedInserter:
+    """Buffers documents in memory and writes them to `collection` with
+    insert_many on flush.
+
+    Documents from a failed write go back to the front of the buffer, which is
+    capped at `max_pending` (oldest dropped first).
+    """
+
+    collection: str
+    label = "documents"
+
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self.pending: List[dict] = []
+
+    def requeue(self, documents: List[dict]):
+        pending = documents + self.pending
+        dropped = len(pending) - self.max_pending
+        if dropped > 0:
+            logger.warning(f"Buffer full, dropping {dropped} oldest {self.label}")
+            pending = pending[dropped:]
+        self.pending = pending
+
+    async def insert_pending(self, collection):
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+
+        try:
+            await collection.insert_many(pending, ordered=False)
+        except BulkWriteError as e:
+            # insert_many assigns _id client-side, so a retried document that already
+            # landed fails with a duplicate key error and is not a loss
+            failed = [
+                pending[error["index"]]
+                for error in e.details.get("writeErrors", [])
+                if error.get("code") != 11000
+            ]
+            if failed:
+                self.requeue(failed)
+                raise
+        except Exception:
+            self.requeue(pending)
+            raise
+
+    async def flush(self):
+        await self.insert_pending(getattr(db, self.collection))
+
+    async def run(self, interval: float):
+        """Flush loop started on application startup"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning(f"Flush of {self.label} failed: {e}")
+
+class UsageRecorder(BufferedInserter):
+    """Buffers per-call LLM usage and periodically flushes it to MongoDB.
+
+    Raw calls go to the `usage` collection; per-day, per-route counters are
+    pre-aggregated in memory and merged into `usage_rollups` with $inc, so
+    reporting reads one document per day and route instead of every call.
+    """
+
+    collection = "usage"
+    label = "usage call records"
+
+    def __init__(self, max_pending: int = USAGE_MAX_PENDING):
+        super().__init__(max_pending)
+        self.rollups: Dict[Tuple[str, str], dict] = {}
+
+    def record(self, user_id: str, route: str, prompt_tokens: int,
+               completion_tokens: int, latency_ms: float, success: bool):
+        now = datetime.utcnow()
+        self.pending.append({
+            "user_id": user_id,
+            "route": route,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": latency_ms,
+            "success": success,
+            "created_at": now
+        })
+
+        self.merge_rollup((now.strftime('%Y-%m-%d'), route), {
+            "calls": 1,
+            "errors": 0 if success else 1,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms_total": latency_ms,
+            "latency_ms_max": latency_ms
+        })
+
+    def merge_rollup(self, key: Tuple[str, str], counters: dict):
+        rollup = self.rollups.get(key)
+        if rollup is None:
+            self.rollups[key] = dict(counters)
+            return
+        for field, value in counters.items():
+            if field == "latency_ms_max":
+                rollup[field] = max(rollup[field], value)
+            else:
+                rollup[field] += value
+
+    async def flush_rollups(self):
+        rollups, self.rollups = self.rollups, {}
+        if not rollups:
+            return
+
+        keys = list(rollups)
+        operations = []
+        for day, route in keys:
+            counters = dict(rollups[(day, route)])
+            latency_max = counters.pop("latency_ms_max")
+            operations.append(UpdateOne(
+                {"_id": f"{day}:{route}"},
+                {
+                    "$inc": counters,
+                    "$max": {"latency_ms_max": latency_max},
+                    "$setOnInsert": {"day": day, "route": route}
+                },
+                upsert=True
+            ))
+
+        try:
+            await db.usage_rollups.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: only the reported operations failed, the rest were applied
+            for error in e.details.get("writeErrors", []):
+                key = keys[error["index"]]
+                self.merge_rollup(key, rollups[key])
+            raise
+        except Exception:
+            for key in keys:
+                self.merge_rollup(key, rollups[key])
+            raise
+
+    async def flush_calls(self):
+        await super().flush()
+
+    async def flush(self):
+        """Write rollups and raw calls independently; failed writes are kept for the next flush"""
+        errors = []
+        for flush_part in (self.flush_rollups, self.flush_calls):
+            try:
+                await flush_part()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+usage_recorder = UsageRecorder()
+
+async def generate_reading(route: str, user_id: str, system_message: str, user_prompt: str) -> str:
+    """Send a prompt to the LLM and record token usage and latency for the call"""
+    chat = await create_llm_chat(system_message)
+    response = ""
+    success = False
+    started = time.perf_counter()
+    try:
+        with span("llm.send_message", route=route):
+            response = await chat.send_message(UserMessage(text=user_prompt))
+        success = True
+        return response
+    finally:
+        usage_recorder.record(
+            user_id=user_id,
+            route=route,
+            prompt_tokens=estimate_tokens(system_message) + estimate_tokens(user_prompt),
+            completion_tokens=estimate_tokens(response),
+            latency_ms=(time.perf_counter() - started) * 1000,
+            success=success
+        )
+
+class ReadingRecorder(BufferedInserter):
+    """Buffers generated readings so requests never wait on the readings insert"""
+
+    collection = "readings"
+    label = "readings"
+
+    def record(self, user_id: str, route: str, reading: AIResponse):
+        if not STORE_READINGS:
+            return
+        self.pending.append({
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "route": route,
+            "tone": reading.tone,
+            "content": reading.content,
+            "generated_at": reading.generated_at
+        })
+
+reading_recorder = ReadingRecorder(READINGS_MAX_PENDING)
+
+# Near-duplicate reading reuse
+class ReadingIndex:
+    """Fixed-capacity cosine-similarity index of readings for one route.
+
+    Only entries in the same bucket (an exact-match key such as tone and
+    date) are candidates. When full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, dimensions: int, capacity: int):
+        self.vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.buckets = np.zeros(capacity, dtype=np.int64)
+        self.last_used = np.zeros(capacity, dtype=np.int64)  # 0 marks an empty slot
+        self.contents: List[Optional[str]] = [None] * capacity
+        self.clock = 0
+
+    def _tick(self) -> int:
+        self.clock += 1
+        return self.clock
+
+    def query(self, bucket: int, vector: np.ndarray, threshold: float) -> Optional[str]:
+        candidates = np.flatnonzero((self.buckets == bucket) & (self.last_used > 0))
+        if candidates.size == 0:
+            return None
+        scores = self.vectors[candidates] @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        slot = candidates[best]
+        self.last_used[slot] = self._tick()
+        return self.contents[slot]
+
+    def add(self, bucket: int, vector: np.ndarray, content: str):
+        slot = int(np.argmin(self.last_used))
+        self.vectors[slot] = vector
+        self.buckets[slot] = bucket
+        self.contents[slot] = content
+        self.last_used[slot] = self._tick()
+
+class ReadingReuseCache:
+    def __init__(self, threshold: float, capacity: int, disabled_routes: set):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.disabled_routes = disabled_routes
+        self.indexes: Dict[str, ReadingIndex] = {}
+
+    def enabled_for(self, route: str) -> bool:
+        return SEMANTIC_REUSE_ENABLED and route not in self.disabled_routes
+
+    @staticmethod
+    def normalize(features: np.ndarray) -> np.ndarray:
+        norm = float(np.linalg.norm(features))
+        return features / norm if norm else features
+
+    def lookup(self, route: str, bucket: str, features: np.ndarray) -> Optional[str]:
+        index = self.indexes.get(route)
+        if index is None:
+            return None
+        return index.query(hash(bucket), self.normalize(features), self.threshold)
+
+    def add(self, route: str, bucket: str, features: np.ndarray, content: str):
+        index = self.indexes.get(route)
+        if index is None:
+            index = self.indexes[route] = ReadingIndex(features.shape[0], self.capacity)
+        index.add(hash(bucket), self.normalize(features), content)
+
+reading_reuse = ReadingReuseCache(
+    SEMANTIC_REUSE_THRESHOLD, SEMANTIC_REUSE_CAPACITY, SEMANTIC_REUSE_DISABLED_ROUTES
+)
+
+async def generate_or_reuse_reading(route: str, user_id: str, system_message: str, user_prompt: str,
+                                    bucket: str, features: np.ndarray) -> str:
+    """Return a stored near-duplicate reading if one is close enough, else call the LLM"""
+    if not reading_reuse.enabled_for(route):
+        return await generate_reading(route, user_id, system_message, user_prompt)
+
+    with span("reuse.lookup", route=route) as lookup_span:
+        reused = reading_reuse.lookup(route, bucket, features)
+        lookup_span.set_attribute("hit", reused is not None)
+    if reused is not None:
+        return reused
+
+    response = await generate_reading(route, user_id, system_message, user_prompt)
+    reading_reuse.add(route, bucket, features, response)
+    return response
+
+# Bulk NDJSON export/import
+# Collection name -> (unique key used for upserts, export projection)
+BULK_COLLECTIONS = {
+    "users": ("id", {"_id": 0, "password": 0}),
+    "readings": ("id", {"_id": 0})
+}
+NDJSON_DATETIME_FIELDS = ("created_at", "generated_at")
+
+async def iter_export_chunks(collection: str, compress: bool = False,
+                             batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Stream a collection as NDJSON (optionally gzip), one cursor batch at a time"""
+    _, projection = BULK_COLLECTIONS[collection]
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    cursor = db[collection].find({}, projection, batch_size=batch_size)
+
+    buffer = []
+    async for document in cursor:
+        buffer.append(orjson.dumps(document, option=orjson.OPT_APPEND_NEWLINE))
+        if len(buffer) >= batch_size:
+            chunk = b"".join(buffer)
+            buffer.clear()
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = b"".join(buffer)
+    if compressor is not None:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into NDJSON lines, transparently gunzipping it"""
+    decompressor = None
+    head = b""
+    sniffed = False
+    pending = b""
+    async for chunk in chunks:
+        if not sniffed:
+            # The gzip magic number is two bytes and may straddle chunks
+            head += chunk
+            if len(head) < 2:
+                continue
+            sniffed = True
+            if head[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(wbits=31)
+            chunk, head = head, b""
+        if decompressor is None:
+            pending += chunk
+        # Concatenated gzip files are multiple members; start a fresh
+        # decompressor on whatever follows the end of each one
+        while decompressor is not None and chunk:
+            if decompressor.eof:
+                decompressor = zlib.decompressobj(wbits=31)
+            pending += decompressor.decompress(chunk)
+            chunk = decompressor.unused_data
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+
+    pending += head
+    if decompressor is not None:
+        pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        yield line
+
+def parse_ndjson_document(line: bytes) -> dict:
+    document = orjson.loads(line)
+    document.pop("_id", None)
+    for field in NDJSON_DATETIME_FIELDS:
+        if isinstance(document.get(field), str):
+            document[field] = datetime.fromisoformat(document[field])
+    return document
+
+class BulkImportError(Exception):
+    """Raised when an import fails; `progress["next_offset"]` is safe to resume from"""
+
+    def __init__(self, message: str, progress: dict):
+        super().__init__(message)
+        self.progress = progress
+
+async def import_ndjson(collection: str, lines: AsyncIterator[bytes], offset: int = 0,
+                        batch_size: int = IMPORT_BATCH_SIZE,
+                        concurrency: int = IMPORT_CONCURRENCY) -> dict:
+    """Upsert NDJSON documents with unordered bulk writes.
+
+    `offset` skips that many documents, so an interrupted import can resume
+    from the returned `next_offset`. Upserts make replaying a batch harmless.
+    """
+    key, _ = BULK_COLLECTIONS[collection]
+    result = {"next_offset": offset, "upserted": 0, "modified": 0, "matched": 0}
+    in_flight = deque()
+
+    async def wait_oldest():
+        end_offset, task = in_flight.popleft()
+        written = await task
+        result["upserted"] += written.upserted_count
+        result["modified"] += written.modified_count
+        result["matched"] += written.matched_count
+        result["next_offset"] = end_offset
+
+    position = 0
+    operations = []
+    try:
+        async for line in lines:
+            if not line.strip():
+                continue
+            position += 1
+            if position <= offset:
+                continue
+            document = parse_ndjson_document(line)
+            operations.append(UpdateOne({key: document[key]}, {"$set": document}, upsert=True))
+
+            if len(operations) >= batch_size:
+                in_flight.append((position, asyncio.ensure_future(
+                    db[collection].bulk_write(operations, ordered=False)
+                )))
+                operations = []
+                if len(in_flight) >= concurrency:
+                    await wait_oldest()
+
+        if operations:
+            in_flight.append((position, asyncio.ensure_future(
+                db[collection].bulk_write(operations, ordered=False)
+            )))
+        while in_flight:
+            await wait_oldest()
+    except Exception as e:
+        for _, task in in_flight:
+            task.cancel()
+        raise BulkImportError(str(e), result) from e
+
+    return result
+
 # Authentication helpers
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -196,36 +1207,238 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def create_access_token(user_id: str) -> str:
+def build_profile_claim(user: dict) -> dict:
+    """Compact, versioned copy of the profile fields used to build prompts"""
+    birth_date = user["birth_date"]
+    return {
+        "v": PROFILE_CLAIM_VERSION,
+        "e": user["email"],
+        "n": user["name"],
+        "bd": birth_date if isinstance(birth_date, str) else birth_date.isoformat(),
+        "bt": user["birth_time"],
+        "bp": user["birth_place"],
+        "zs": user["zodiac_sign"]
+    }
+
+def user_from_profile_claim(user_id: str, profile: dict) -> User:
+    return User(
+        id=user_id,
+        email=profile["e"],
+        name=profile["n"],
+        birth_date=profile["bd"],
+        birth_time=profile["bt"],
+        birth_place=profile["bp"],
+        zodiac_sign=profile["zs"]
+    )
+
+def create_access_token(user_id: str, profile: Optional[dict] = None, token_version: int = 0) -> str:
+    payload = {
+        "user_id": user_id,
+        "typ": "access",
+        "tv": token_version,
+        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_TTL_MINUTES)
+    }
+    if JWT_EMBED_PROFILE and profile is not None:
+        payload["prf"] = build_profile_claim(profile)
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def create_refresh_token(user_id: str, token_version: int = 0) -> str:
     payload = {
         "user_id": user_id,
-        "exp": datetime.utcnow() + timedelta(days=7)
+        "typ": "refresh",
+        "tv": token_version,
+        "exp": datetime.utcnow() + timedelta(days=REFRESH_TOKEN_TTL_DAYS)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def create_token_pair(user: dict) -> dict:
+    token_version = user.get("token_version", 0)
+    return {
+        "access_token": create_access_token(user["id"], user, token_version),
+        "refresh_token": create_refresh_token(user["id"], token_version),
+        "token_type": "bearer"
+    }
+
+class TokenVersionCache:
+    """Short-lived in-process cache of each user's token revocation version"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 100000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[Optional[int], float]]" = OrderedDict()
+
+    async def get(self, user_id: str) -> Optional[int]:
+        """Return the current version, or None if the user no longer exists"""
+        cached = self.entries.get(user_id)
+        now = time.monotonic()
+        if cached is not None and cached[1] > now:
+            return cached[0]
+
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "token_version": 1})
+        version = None if user is None else user.get("token_version", 0)
+        self.set(user_id, version)
+        return version
+
+    def set(self, user_id: str, version: Optional[int]):
+        self.entries[user_id] = (version, time.monotonic() + self.ttl_seconds)
+        self.entries.move_to_end(user_id)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+token_versions = TokenVersionCache(TOKEN_VERSION_CACHE_TTL_SECONDS)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        with span("jwt.decode"):
+            payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = payload.get("user_id")
-        if user_id is None:
+        if user_id is None or payload.get("typ", "access") != "access":
             raise HTTPException(status_code=401, detail="Invalid token")
+        token_version = payload.get("tv", 0)
+
+        # Fast path: profile claim in the token, at most one cached version lookup
+        profile = payload.get("prf")
+        if profile is not None and profile.get("v") == PROFILE_CLAIM_VERSION:
+            with span("token_version.lookup"):
+                current_version = await token_versions.get(user_id)
+            if current_version != token_version:
+                raise HTTPException(status_code=401, detail="Token revoked")
+            return user_from_profile_claim(user_id, profile)
         
-        user = await db.users.find_one({"id": user_id})
+        with span("db.users.find_one"):
+            user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
+        if user.get("token_version", 0) != token_version:
+            raise HTTPException(status_code=401, detail="Token revoked")
         
         # Convert string date back to date object if needed
         if isinstance(user["birth_date"], str):
             user["birth_date"] = date.fromisoformat(user["birth_date"])
             
         return User(**user)
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except (jwt.InvalidTokenError, Exception) as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+# Rate limiting
+def seconds_until_token(tokens: float, refill_per_second: float) -> float:
+    """Wait before a bucket holds a whole token again; infinite for fixed quotas"""
+    if refill_per_second <= 0:
+        return math.inf
+    return (1 - tokens) / refill_per_second
+
+class InMemoryRateLimitBackend:
+    """Token buckets kept in process memory; suitable for a single worker"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Consume one token; return 0 if allowed, otherwise seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = seconds_until_token(tokens, refill_per_second)
+
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        # Evicting the least recently used bucket only resets it to full
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+class MongoRateLimitBackend:
+    """Token buckets shared by all workers, updated atomically in MongoDB"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.time()
+        refilled = {"$min": [
+            capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", capacity]},
+                {"$multiply": [
+                    {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]},
+                    refill_per_second
+                ]}
+            ]}
+        ]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": [
+                    "$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"
+                ]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return seconds_until_token(bucket["tokens"], refill_per_second)
+
+class TokenBucketLimiter:
+    def __init__(self, backend, capacity: float, refill_per_second: float):
+        self.backend = backend
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+
+    async def take(self, user_id: str, route: str) -> float:
+        try:
+            return await self.backend.take(f"{user_id}:{route}", self.capacity, self.refill_per_second)
+        except Exception as e:
+            # Fail open: a limiter outage should not take the API down with it
+            logger.warning(f"Rate limiter unavailable: {e}")
+            return 0.0
+
+def create_rate_limit_backend(name: str):
+    if name == "mongo":
+        return MongoRateLimitBackend(db.rate_limits)
+    return InMemoryRateLimitBackend()
+
+rate_limiter = TokenBucketLimiter(
+    create_rate_limit_backend(RATE_LIMIT_BACKEND),
+    capacity=RATE_LIMIT_CAPACITY,
+    refill_per_second=RATE_LIMIT_REFILL_PER_SECOND
+)
+
+def rate_limit(route: str):
+    """Dependency factory: authenticate the user and spend one token for the route"""
+    async def dependency(current_user: User = Depends(get_current_user)) -> User:
+        with span("rate_limit.take", route=route):
+            retry_after = await rate_limiter.take(current_user.id, route)
+        if retry_after > 0:
+            # A fixed quota never refills, so there is no meaningful Retry-After
+            headers = {} if math.isinf(retry_after) else {"Retry-After": str(math.ceil(retry_after))}
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers=headers
+            )
+        return current_user
+    return dependency
+
 # Authentication routes
-@api_router.post("/auth/register")
+@api_router.post("/auth/register", response_model=AuthResponse)
 async def register(user_data: UserRegister):
     # Check if user exists
     existing_user = await db.users.find_one({"email": user_data.email})
@@ -253,51 +1466,87 @@ async def register(user_data: UserRegister):
     
     await db.users.insert_one(user_dict)
     
-    # Create access token
-    token = create_access_token(user.id)
+    # Create access and refresh tokens
+    tokens = create_token_pair(user_dict)
     
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "name": user.name,
-            "zodiac_sign": user.zodiac_sign
-        }
-    }
+    return fast_response(AuthResponse(
+        **tokens,
+        user=AuthUser(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            zodiac_sign=user.zodiac_sign
+        )
+    ))
 
-@api_router.post("/auth/login")
+@api_router.post("/auth/login", response_model=AuthResponse)
 async def login(login_data: UserLogin):
     # Find user
     user_data = await db.users.find_one({"email": login_data.email})
     if not user_data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Verify password
-    if not verify_password(login_data.password, user_data["password"]):
+    # Verify password; imported users have no hash until one is set
+    hashed_password = user_data.get("password")
+    if not hashed_password or not verify_password(login_data.password, hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Create access token
-    token = create_access_token(user_data["id"])
+    # Create access and refresh tokens
+    tokens = create_token_pair(user_data)
     
-    return {
-        "access_token": token,
-        "token_type": "bearer",
-        "user": {
-            "id": user_data["id"],
-            "email": user_data["email"],
-            "name": user_data["name"],
-            "zodiac_sign": user_data["zodiac_sign"]
-        }
-    }
+    return fast_response(AuthResponse(
+        **tokens,
+        user=AuthUser(
+            id=user_data["id"],
+            email=user_data["email"],
+            name=user_data["name"],
+            zodiac_sign=user_data["zodiac_sign"]
+        )
+    ))
 
-# Astrology AI routes
-@api_router.post("/horoscope/daily", response_model=AIResponse)
-async def get_daily_horoscope(
-    request: HoroscopeRequest,
-    current_user: User = Depends(get_current_user)
-):
+@api_router.post("/auth/refresh", response_model=RefreshResponse)
+async def refresh_access_token(refresh_data: RefreshRequest):
+    try:
+        payload = jwt.decode(refresh_data.refresh_token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Refresh token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    if payload.get("typ") != "refresh" or payload.get("user_id") is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    # Always reload the profile so edits are picked up by the new access token
+    user_data = await db.users.find_one({"id": payload["user_id"]})
+    if user_data is None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    token_version = user_data.get("token_version", 0)
+    token_versions.set(user_data["id"], token_version)
+    if payload.get("tv", 0) != token_version:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    return fast_response(RefreshResponse(
+        access_token=create_access_token(user_data["id"], user_data, token_version),
+        token_type="bearer"
+    ))
+
+@api_router.post("/auth/revoke", response_model=RevokeResponse)
+async def revoke_tokens(current_user: User = Depends(get_current_user)):
+    # Bumping the version invalidates every access and refresh token issued so far
+    user_data = await db.users.find_one_and_update(
+        {"id": current_user.id},
+        {"$inc": {"token_version": 1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if user_data is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    token_versions.set(user_data["id"], user_data["token_version"])
+    return fast_response(RevokeResponse(revoked=True))
+
+# Prompt building
+def build_horoscope_prompts(current_user: User, request: HoroscopeRequest) -> Tuple[str, str]:
+    """System message and user prompt for the daily horoscope"""
     tone_instruction = get_tone_instructions(request.tone)
     
     system_message = f"""You are an expert astrologer providing personalized daily horoscopes. 
@@ -315,6 +1564,62 @@ async def get_daily_horoscope(
     Their zodiac sign is {current_user.zodiac_sign}.
     Today's date is {datetime.now().strftime('%B %d, %Y')}.
     Include specific guidance for today."""
+    return system_message, user_prompt
+
+def build_compatibility_prompts(current_user: User, request: CompatibilityRequest, partner_zodiac: str) -> Tuple[str, str]:
+    """System message and user prompt for the compatibility analysis"""
+    tone_instruction = get_tone_instructions(request.tone)
+    
+    system_message = f"""You are an expert astrologer specializing in relationship compatibility analysis.
+    {tone_instruction}
+    
+    Provide detailed compatibility analysis covering:
+    - Overall compatibility percentage and rating
+    - Strengths in the relationship
+    - Potential challenges
+    - Communication tips
+    - Long-term relationship potential
+    - Keep response between 200-300 words
+    """
+    
+    user_prompt = f"""Analyze the compatibility between:
+    Person 1: Born {current_user.birth_date} at {current_user.birth_time} in {current_user.birth_place} ({current_user.zodiac_sign})
+    Person 2: Born {request.partner_birth_date} at {request.partner_birth_time} in {request.partner_birth_place} ({partner_zodiac})
+    
+    Provide a comprehensive compatibility analysis with specific insights."""
+    return system_message, user_prompt
+
+def build_friend_advice_prompts(current_user: User, request: FriendAdviceRequest) -> Tuple[str, str]:
+    """System message and user prompt for the friend communication advice"""
+    tone_instruction = get_tone_instructions(request.tone)
+    
+    system_message = f"""You are an expert astrologer providing personalized communication advice based on astrological insights.
+    {tone_instruction}
+    
+    Focus on:
+    - Communication strategies based on astrological personality
+    - How to connect better with different personality types
+    - Practical tips for improving relationships
+    - Understanding different communication styles
+    - Keep response between 150-250 words
+    """
+    
+    friends_list = ", ".join(request.friend_names)
+    user_prompt = f"""Based on the astrological profile of someone born on {current_user.birth_date} 
+    at {current_user.birth_time} in {current_user.birth_place} ({current_user.zodiac_sign}),
+    provide personalized advice on how to communicate better with friends named: {friends_list}.
+    
+    Give specific communication tips and strategies for building stronger friendships."""
+    return system_message, user_prompt
+
+# Astrology AI routes
+@api_router.post("/horoscope/daily", response_model=AIResponse)
+async def get_daily_horoscope(
+    request: HoroscopeRequest,
+    current_user: User = Depends(rate_limit("horoscope_daily"))
+):
+    with span("prompt.build"):
+        system_message, user_prompt = build_horoscope_prompts(current_user, request)
     
     try:
         # For testing purposes, return mock response
@@ -322,48 +1627,39 @@ async def get_daily_horoscope(
             mock_response = """Your daily horoscope suggests that today is an excellent day for new beginnings. 
             The alignment of planets indicates favorable conditions for starting projects or relationships. 
             Take time to reflect on your goals and aspirations. Trust your intuition when making decisions today."""
-            return AIResponse(
+            return fast_response(AIResponse(
                 content=mock_response,
                 tone=request.tone
-            )
+            ))
             
         # Real implementation for production
-        chat = await create_llm_chat(system_message)
-        user_message = UserMessage(text=user_prompt)
-        response = await chat.send_message(user_message)
-        
-        return AIResponse(
+        response = await generate_or_reuse_reading(
+            "horoscope_daily", current_user.id, system_message, user_prompt,
+            bucket=":".join([
+                request.tone,
+                datetime.now().date().isoformat(),
+                birth_details_key(current_user.birth_date, current_user.birth_place)
+            ]),
+            features=chart_features(current_user.zodiac_sign, current_user.birth_date, current_user.birth_time)
+        )
+        reading = AIResponse(
             content=response,
             tone=request.tone
         )
+        reading_recorder.record(current_user.id, "horoscope_daily", reading)
+        
+        return fast_response(reading)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
 @api_router.post("/compatibility/analyze", response_model=AIResponse)
 async def analyze_compatibility(
     request: CompatibilityRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(rate_limit("compatibility_analyze"))
 ):
-    partner_zodiac = calculate_zodiac_sign(request.partner_birth_date)
-    tone_instruction = get_tone_instructions(request.tone)
-    
-    system_message = f"""You are an expert astrologer specializing in relationship compatibility analysis.
-    {tone_instruction}
-    
-    Provide detailed compatibility analysis covering:
-    - Overall compatibility percentage and rating
-    - Strengths in the relationship
-    - Potential challenges
-    - Communication tips
-    - Long-term relationship potential
-    - Keep response between 200-300 words
-    """
-    
-    user_prompt = f"""Analyze the compatibility between:
-    Person 1: Born {current_user.birth_date} at {current_user.birth_time} in {current_user.birth_place} ({current_user.zodiac_sign})
-    Person 2: Born {request.partner_birth_date} at {request.partner_birth_time} in {request.partner_birth_place} ({partner_zodiac})
-    
-    Provide a comprehensive compatibility analysis with specific insights."""
+    with span("prompt.build"):
+        partner_zodiac = calculate_zodiac_sign(request.partner_birth_date)
+        system_message, user_prompt = build_compatibility_prompts(current_user, request, partner_zodiac)
     
     try:
         # For testing purposes, return mock response
@@ -377,47 +1673,41 @@ async def analyze_compatibility(
             Challenges: Different approaches to financial matters, occasional stubbornness
             
             Long-term potential is high with continued effort on both sides."""
-            return AIResponse(
+            return fast_response(AIResponse(
                 content=mock_response,
                 tone=request.tone
-            )
+            ))
             
         # Real implementation for production
-        chat = await create_llm_chat(system_message)
-        user_message = UserMessage(text=user_prompt)
-        response = await chat.send_message(user_message)
-        
-        return AIResponse(
+        response = await generate_or_reuse_reading(
+            "compatibility_analyze", current_user.id, system_message, user_prompt,
+            bucket=":".join([
+                request.tone,
+                birth_details_key(current_user.birth_date, current_user.birth_place),
+                birth_details_key(request.partner_birth_date, request.partner_birth_place)
+            ]),
+            features=np.concatenate([
+                chart_features(current_user.zodiac_sign, current_user.birth_date, current_user.birth_time),
+                chart_features(partner_zodiac, request.partner_birth_date, request.partner_birth_time)
+            ])
+        )
+        reading = AIResponse(
             content=response,
             tone=request.tone
         )
+        reading_recorder.record(current_user.id, "compatibility_analyze", reading)
+        
+        return fast_response(reading)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
 @api_router.post("/friends/advice", response_model=AIResponse)
 async def get_friend_advice(
     request: FriendAdviceRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(rate_limit("friends_advice"))
 ):
-    tone_instruction = get_tone_instructions(request.tone)
-    
-    system_message = f"""You are an expert astrologer providing personalized communication advice based on astrological insights.
-    {tone_instruction}
-    
-    Focus on:
-    - Communication strategies based on astrological personality
-    - How to connect better with different personality types
-    - Practical tips for improving relationships
-    - Understanding different communication styles
-    - Keep response between 150-250 words
-    """
-    
-    friends_list = ", ".join(request.friend_names)
-    user_prompt = f"""Based on the astrological profile of someone born on {current_user.birth_date} 
-    at {current_user.birth_time} in {current_user.birth_place} ({current_user.zodiac_sign}),
-    provide personalized advice on how to communicate better with friends named: {friends_list}.
-    
-    Give specific communication tips and strategies for building stronger friendships."""
+    with span("prompt.build"):
+        system_message, user_prompt = build_friend_advice_prompts(current_user, request)
     
     try:
         # For testing purposes, return mock response
@@ -430,26 +1720,36 @@ async def get_friend_advice(
             For Taylor: Connect on emotional topics they care about
             
             Your natural leadership qualities make you a valued friend."""
-            return AIResponse(
+            return fast_response(AIResponse(
                 content=mock_response,
                 tone=request.tone
-            )
+            ))
             
         # Real implementation for production
-        chat = await create_llm_chat(system_message)
-        user_message = UserMessage(text=user_prompt)
-        response = await chat.send_message(user_message)
-        
-        return AIResponse(
+        # Friend names must match exactly (in any order); the chart may differ slightly
+        friends_key = "|".join(sorted(name.strip().lower() for name in request.friend_names))
+        response = await generate_or_reuse_reading(
+            "friends_advice", current_user.id, system_message, user_prompt,
+            bucket=":".join([
+                request.tone,
+                friends_key,
+                birth_details_key(current_user.birth_date, current_user.birth_place)
+            ]),
+            features=chart_features(current_user.zodiac_sign, current_user.birth_date, current_user.birth_time)
+        )
+        reading = AIResponse(
             content=response,
             tone=request.tone
         )
+        reading_recorder.record(current_user.id, "friends_advice", reading)
+        
+        return fast_response(reading)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI service error: {str(e)}")
 
-@api_router.get("/profile")
+@api_router.get("/profile", response_model=ProfileResponse)
 async def get_profile(current_user: User = Depends(get_current_user)):
-    return {
+    return ORJSONResponse({
         "id": current_user.id,
         "email": current_user.email,
         "name": current_user.name,
@@ -457,7 +1757,7 @@ async def get_profile(current_user: User = Depends(get_current_user)):
         "birth_time": current_user.birth_time,
         "birth_place": current_user.birth_place,
         "zodiac_sign": current_user.zodiac_sign
-    }
+    })
 
 class UserUpdate(BaseModel):
     name: Optional[str] = None
@@ -465,7 +1765,7 @@ class UserUpdate(BaseModel):
     birth_time: Optional[str] = None
     birth_place: Optional[str] = None
 
-@api_router.put("/profile")
+@api_router.put("/profile", response_model=ProfileResponse)
 async def update_profile(
     profile_update: UserUpdate,
     current_user: User = Depends(get_current_user)
@@ -495,23 +1795,165 @@ async def update_profile(
         )
     
     # Return updated profile
-    updated_user = await db.users.find_one({"id": current_user.id})
+    updated_user = await db.users.find_one({"id": current_user.id}, {"_id": 0, "password": 0})
     if isinstance(updated_user["birth_date"], str):
         updated_user["birth_date"] = date.fromisoformat(updated_user["birth_date"])
     
-    return {
+    return ORJSONResponse({
         "id": updated_user["id"],
         "email": updated_user["email"],
         "name": updated_user["name"],
         "birth_date": updated_user["birth_date"],
         "birth_time": updated_user["birth_time"],
         "birth_place": updated_user["birth_place"],
-        "zodiac_sign": updated_user["zodiac_sign"]
-    }
+        "zodiac_sign": updated_user["zodiac_sign"],
+        # Fresh access token carrying the updated profile claim
+        "access_token": create_access_token(
+            updated_user["id"], updated_user, updated_user.get("token_version", 0)
+        )
+    })
+
+@api_router.get("/admin/usage")
+async def get_usage_summary(
+    days: int = Query(7, ge=1, le=366),
+    admin_user: User = Depends(get_admin_user)
+):
+    # Reads pre-aggregated rollups: one document per day and route
+    since = (datetime.utcnow().date() - timedelta(days=days - 1)).isoformat()
+    cursor = db.usage_rollups.find({"day": {"$gte": since}}, {"_id": 0}).sort("day", 1)
+    rollups = await cursor.to_list(length=None)
+
+    totals = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for rollup in rollups:
+        for key in totals:
+            totals[key] += rollup.get(key, 0)
+        rollup["latency_ms_avg"] = rollup["latency_ms_total"] / rollup["calls"] if rollup.get("calls") else 0.0
+
+    return ORJSONResponse({
+        "days": days,
+        "since": since,
+        "totals": totals,
+        "rollups": rollups
+    })
+
+@api_router.get("/admin/traces/slow")
+async def get_slow_traces(
+    limit: int = Query(20, ge=1, le=1000),
+    admin_user: User = Depends(get_admin_user)
+):
+    # Most recent first, each with its full span breakdown
+    traces = list(trace_recorder.slow_traces)[-limit:][::-1]
+    return ORJSONResponse({"threshold_ms": TRACE_SLOW_REQUEST_MS, "count": len(traces), "traces": traces})
+
+def get_bulk_collection(collection: str) -> str:
+    if collection not in BULK_COLLECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    return collection
+
+@api_router.get("/admin/export/{collection}")
+async def export_collection(
+    collection: str = Depends(get_bulk_collection),
+    compress: bool = False,
+    admin_user: User = Depends(get_admin_user)
+):
+    filename = f"{collection}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        iter_export_chunks(collection, compress=compress),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.post("/admin/import/{collection}")
+async def import_collection(
+    request: Request,
+    collection: str = Depends(get_bulk_collection),
+    offset: int = Query(0, ge=0),
+    admin_user: User = Depends(get_admin_user)
+):
+    # Body may be plain or gzip NDJSON; it is consumed as a stream
+    try:
+        result = await import_ndjson(collection, iter_ndjson_lines(request.stream()), offset=offset)
+        return ORJSONResponse(result)
+    except BulkImportError as e:
+        raise HTTPException(status_code=500, detail={"error": str(e), **e.progress})
 
 # Include the router in the main app
 app.include_router(api_router)
 
+class TracingMiddleware:
+    """Pure ASGI middleware tracing requests under `prefix`.
+
+    The trace ends when the app returns, i.e. after the last body chunk has
+    been sent, so streamed responses such as exports are timed in full.
+    Other paths (health probes) pass straight through.
+    """
+
+    def __init__(self, app, prefix: str):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], scope["path"])
+        trace_token = current_trace.set(trace)
+        root_span = start_span(f"{scope['method']} {scope['path']}")
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"x-trace-id", trace.trace_id.encode())]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_id)
+        except BaseException:
+            trace.status_code = trace.status_code or 500
+            root_span.status = "error"
+            raise
+        finally:
+            root_span.end()
+            current_trace.reset(trace_token)
+            # Group by route template rather than raw path once routing has run
+            route = scope.get("route")
+            if route is not None:
+                trace.path = route.path
+            trace.duration_ms = (time.perf_counter_ns() - root_span.started) / 1e6
+            trace_recorder.record(trace)
+
+app.add_middleware(TracingMiddleware, prefix=api_router.prefix)
+
+# Load balancer probes (outside /api)
+@app.get("/healthz")
+async def healthz():
+    # Liveness only: no I/O, so a busy database does not get the process restarted
+    return ORJSONResponse({"status": "ok", "mongo_pool": pool_monitor.snapshot()})
+
+@app.get("/readyz")
+async def readyz():
+    pool = pool_monitor.snapshot()
+    checks = {
+        "warmed_up": warmup_state["complete"],
+        "mongo": False,
+        "pool_saturation": pool["saturation"] < READINESS_MAX_POOL_SATURATION
+    }
+    try:
+        await asyncio.wait_for(db.command("ping"), READINESS_PING_TIMEOUT_SECONDS)
+        checks["mongo"] = True
+    except Exception:
+        pass
+
+    ready = all(checks.values())
+    return ORJSONResponse(
+        {"status": "ready" if ready else "not_ready", "checks": checks, "mongo_pool": pool, "warmup": warmup_state},
+        status_code=200 if ready else 503
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -526,7 +1968,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
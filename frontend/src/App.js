@@ -30,6 +30,31 @@ const API = `${BACKEND_URL}/api`;
 // Auth Context
 const AuthContext = createContext();
 
+// Shared so that concurrent 401s trigger a single refresh request
+let refreshRequest = null;
+
+const storeAccessToken = (accessToken) => {
+  localStorage.setItem('token', accessToken);
+  axios.defaults.headers.common['Authorization'] = `Bearer ${accessToken}`;
+};
+
+const refreshAccessToken = () => {
+  if (!refreshRequest) {
+    const refreshToken = localStorage.getItem('refreshToken');
+    refreshRequest = (refreshToken
+      ? axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken })
+          .then((response) => {
+            storeAccessToken(response.data.access_token);
+            return response.data.access_token;
+          })
+      : Promise.reject(new Error('No refresh token'))
+    ).finally(() => {
+      refreshRequest = null;
+    });
+  }
+  return refreshRequest;
+};
+
 const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
   const [token, setToken] = useState(localStorage.getItem('token'));
@@ -42,6 +67,29 @@ const AuthProvider = ({ children }) => {
     }
   }, [token]);
 
+  // Access tokens can be short-lived: renew once on 401 and retry the request
+  useEffect(() => {
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (error) => {
+        const request = error.config;
+        const isAuthRoute = request && request.url && request.url.startsWith(`${API}/auth/`);
+        if (!error.response || error.response.status !== 401 || !request || request._retried || isAuthRoute) {
+          return Promise.reject(error);
+        }
+        request._retried = true;
+        try {
+          const accessToken = await refreshAccessToken();
+          request.headers['Authorization'] = `Bearer ${accessToken}`;
+          return axios(request);
+        } catch (refreshError) {
+          return Promise.reject(error);
+        }
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   const fetchProfile = async () => {
     try {
       const response = await axios.get(`${API}/profile`);
@@ -55,15 +103,23 @@ const AuthProvider = ({ children }) => {
   const updateProfile = async (profileData) => {
     try {
       const response = await axios.put(`${API}/profile`, profileData);
-      setUser(response.data);
-      return response.data;
+      const { access_token: accessToken, ...profile } = response.data;
+      // The new token carries the edited profile, so later readings use it
+      if (accessToken) {
+        storeAccessToken(accessToken);
+      }
+      setUser(profile);
+      return profile;
     } catch (error) {
       throw error;
     }
   };
 
-  const login = (token, userData) => {
+  const login = (token, userData, refreshToken) => {
     localStorage.setItem('token', token);
+    if (refreshToken) {
+      localStorage.setItem('refreshToken', refreshToken);
+    }
     setToken(token);
     setUser(userData);
     axios.defaults.headers.common['Authorization'] = `Bearer ${token}`;
@@ -71,6 +127,7 @@ const AuthProvider = ({ children }) => {
 
   const logout = () => {
     localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('selectedTone');
     setToken(null);
     setUser(null);
@@ -178,7 +235,7 @@ const RegisterForm = ({ onNavigate }) => {
     setError('');
     try {
       const response = await axios.post(`${API}/auth/register`, data);
-      login(response.data.access_token, response.data.user);
+      login(response.data.access_token, response.data.user, response.data.refresh_token);
     } catch (error) {
       setError(error.response?.data?.detail || 'Registration failed');
     } finally {
@@ -312,7 +369,7 @@ const LoginForm = ({ onNavigate }) => {
     setError('');
     try {
       const response = await axios.post(`${API}/auth/login`, data);
-      login(response.data.access_token, response.data.user);
+      login(response.data.access_token, response.data.user, response.data.refresh_token);
     } catch (error) {
       setError(error.response?.data?.detail || 'Login failed');
     } finally {
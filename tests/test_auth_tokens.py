@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+import server
+
+USER = {
+    "id": "user-1",
+    "email": "user@example.com",
+    "name": "Test User",
+    "birth_date": "1990-05-15",
+    "birth_time": "14:30",
+    "birth_place": "New York, USA",
+    "zodiac_sign": "Taurus",
+    "password": "hash"
+}
+
+
+class FakeUsers:
+    def __init__(self, *documents):
+        self.documents = {document["id"]: dict(document) for document in documents}
+        self.find_one_calls = 0
+
+    async def find_one(self, query, projection=None):
+        self.find_one_calls += 1
+        document = self.documents.get(query["id"])
+        return dict(document) if document is not None else None
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        document = self.documents.get(query["id"])
+        if document is None:
+            return None
+        for field, amount in update["$inc"].items():
+            document[field] = document.get(field, 0) + amount
+        return dict(document)
+
+
+@pytest.fixture
+def users(monkeypatch):
+    users = FakeUsers(USER)
+    monkeypatch.setattr(server, "db", SimpleNamespace(users=users))
+    monkeypatch.setattr(server, "token_versions", server.TokenVersionCache(ttl_seconds=60))
+    monkeypatch.setattr(server, "JWT_EMBED_PROFILE", True)
+    return users
+
+
+def authenticate(token):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(server.get_current_user(credentials))
+
+
+def refresh(token):
+    response = asyncio.run(server.refresh_access_token(server.RefreshRequest(refresh_token=token)))
+    return orjson.loads(response.body)
+
+
+def decode(token):
+    return server.jwt.decode(token, server.JWT_SECRET, algorithms=[server.JWT_ALGORITHM])
+
+
+def test_claim_fast_path_skips_users_lookup_once_version_is_cached(users):
+    token = server.create_access_token(USER["id"], USER)
+    authenticate(token)
+    lookups = users.find_one_calls
+
+    user = authenticate(token)
+
+    assert users.find_one_calls == lookups
+    assert user.zodiac_sign == "Taurus"
+    assert user.birth_place == "New York, USA"
+
+
+def test_refresh_token_is_rejected_as_access_token(users):
+    with pytest.raises(HTTPException) as error:
+        authenticate(server.create_refresh_token(USER["id"]))
+    assert error.value.status_code == 401
+
+
+def test_revoke_invalidates_issued_access_tokens(users):
+    token = server.create_access_token(USER["id"], USER)
+    user = authenticate(token)
+
+    asyncio.run(server.revoke_tokens(user))
+
+    with pytest.raises(HTTPException) as error:
+        authenticate(token)
+    assert error.value.status_code == 401
+    assert error.value.detail == "Token revoked"
+
+
+def test_refresh_rejects_revoked_token(users):
+    refresh_token = server.create_refresh_token(USER["id"])
+    users.documents[USER["id"]]["token_version"] = 1
+
+    with pytest.raises(HTTPException) as error:
+        refresh(refresh_token)
+    assert error.value.status_code == 401
+
+
+def test_refresh_rejects_access_token(users):
+    with pytest.raises(HTTPException) as error:
+        refresh(server.create_access_token(USER["id"], USER))
+    assert error.value.status_code == 401
+
+
+def test_refresh_returns_updated_profile_claim(users):
+    refresh_token = server.create_refresh_token(USER["id"])
+    users.documents[USER["id"]]["birth_place"] = "Tokyo, Japan"
+
+    access_token = refresh(refresh_token)["access_token"]
+
+    assert decode(access_token)["prf"]["bp"] == "Tokyo, Japan"
+    assert authenticate(access_token).birth_place == "Tokyo, Japan"
+
+
+def test_unknown_claim_version_falls_back_to_database(users):
+    payload = decode(server.create_access_token(USER["id"], USER))
+    payload["prf"] = {**payload["prf"], "v": server.PROFILE_CLAIM_VERSION + 1, "bp": "Stale Place"}
+    token = server.jwt.encode(payload, server.JWT_SECRET, algorithm=server.JWT_ALGORITHM)
+
+    user = authenticate(token)
+
+    assert users.find_one_calls == 1
+    assert user.birth_place == "New York, USA"
@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import OperationFailure
+
+import server
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeCollection:
+    """Upserts by id into a dict; optionally fails on the Nth bulk_write"""
+
+    def __init__(self, documents=(), fail_on_call=None):
+        self.documents = {document["id"]: dict(document) for document in documents}
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+
+    def find(self, query, projection, batch_size=None):
+        excluded = {key for key, value in projection.items() if not value}
+        return FakeCursor([
+            {key: value for key, value in document.items() if key not in excluded}
+            for document in self.documents.values()
+        ])
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("connection reset")
+        for operation in operations:
+            document = operation._doc["$set"]
+            self.documents.setdefault(document["id"], {}).update(document)
+        return type("Result", (), {"upserted_count": len(operations), "modified_count": 0, "matched_count": 0})()
+
+
+class IndexedCollection:
+    """Records index calls; an existing non-unique `id_1` conflicts with unique=True"""
+
+    def __init__(self, legacy_id_index=False):
+        self.indexes = {"id_1": {"unique": False}} if legacy_id_index else {}
+        self.dropped = []
+
+    async def create_index(self, keys, unique=False):
+        name = keys + "_1" if isinstance(keys, str) else "_".join(f"{field}_{order}" for field, order in keys)
+        if name in self.indexes and self.indexes[name]["unique"] != unique:
+            raise OperationFailure("Index already exists with different options", code=85)
+        self.indexes[name] = {"unique": unique}
+
+    async def drop_index(self, name):
+        self.dropped.append(name)
+        del self.indexes[name]
+
+
+def make_users(count):
+    return [
+        {
+            "id": str(n),
+            "email": f"user{n}@example.com",
+            "password": "hash",
+            "created_at": datetime(2024, 1, 1, 12, 0, n % 60)
+        }
+        for n in range(count)
+    ]
+
+
+async def chunked(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(items):
+    return [item async for item in items]
+
+
+def export(monkeypatch, collection, compress):
+    monkeypatch.setattr(server, "db", {"users": collection})
+    chunks = server.iter_export_chunks("users", compress=compress, batch_size=7)
+    return b"".join(asyncio.run(collect(chunks)))
+
+
+def test_export_gzip_split_import_round_trip(monkeypatch):
+    exported = export(monkeypatch, FakeCollection(make_users(50)), compress=True)
+    assert exported[:2] == b"\x1f\x8b"
+
+    target = FakeCollection()
+    monkeypatch.setattr(server, "db", {"users": target})
+    result = asyncio.run(server.import_ndjson(
+        "users", server.iter_ndjson_lines(chunked(exported, 13)), batch_size=8, concurrency=2
+    ))
+
+    assert result["next_offset"] == 50
+    assert len(target.documents) == 50
+    imported = target.documents["7"]
+    assert "password" not in imported
+    assert imported["created_at"] == datetime(2024, 1, 1, 12, 0, 7)
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_split_handles_single_byte_chunks(monkeypatch, compress):
+    exported = export(monkeypatch, FakeCollection(make_users(20)), compress=compress)
+    lines = asyncio.run(collect(server.iter_ndjson_lines(chunked(exported, 1))))
+    assert len([line for line in lines if line.strip()]) == 20
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+def test_split_reads_every_gzip_member(chunk_size):
+    # e.g. `cat part1.ndjson.gz part2.ndjson.gz > all.ndjson.gz`
+    data = gzip.compress(b'{"id": "1"}\n{"id": "2"}\n') + gzip.compress(b'{"id": "3"}\n') + gzip.compress(b'{"id": "4"}')
+    lines = asyncio.run(collect(server.iter_ndjson_lines(chunked(data, chunk_size))))
+    assert [line for line in lines if line.strip()] == [b'{"id": "1"}', b'{"id": "2"}', b'{"id": "3"}', b'{"id": "4"}']
+
+
+def test_resume_from_next_offset_after_failure(monkeypatch):
+    exported = gzip.compress(b"".join(
+        server.orjson.dumps(user, option=server.orjson.OPT_APPEND_NEWLINE) for user in make_users(40)
+    ))
+    target = FakeCollection(fail_on_call=3)
+    monkeypatch.setattr(server, "db", {"users": target})
+
+    with pytest.raises(server.BulkImportError) as failure:
+        asyncio.run(server.import_ndjson(
+            "users", server.iter_ndjson_lines(chunked(exported, 64)), batch_size=10, concurrency=1
+        ))
+    next_offset = failure.value.progress["next_offset"]
+    assert next_offset == 20
+
+    result = asyncio.run(server.import_ndjson(
+        "users", server.iter_ndjson_lines(chunked(exported, 64)), offset=next_offset, batch_size=10
+    ))
+    assert result["next_offset"] == 40
+    assert len(target.documents) == 40
+
+
+def test_ensure_indexes_makes_id_unique(monkeypatch):
+    users, readings = IndexedCollection(legacy_id_index=True), IndexedCollection()
+    monkeypatch.setattr(server, "db", SimpleNamespace(
+        users=users, readings=readings, usage=IndexedCollection(), usage_rollups=IndexedCollection()
+    ))
+
+    asyncio.run(server.ensure_indexes())
+    asyncio.run(server.ensure_indexes())
+
+    assert users.dropped == ["id_1"]
+    assert users.indexes["id_1"] == {"unique": True}
+    assert readings.indexes["id_1"] == {"unique": True}
+    assert "user_id_1_generated_at_-1" in readings.indexes
@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+import server
+
+
+class FakeDatabase:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    async def command(self, name):
+        if self.fail:
+            raise ConnectionError("no primary")
+        return {"ok": 1}
+
+
+def event(address=("mongo", 27017)):
+    return SimpleNamespace(address=address)
+
+
+def readyz(monkeypatch, database, complete=True, monitor=None):
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "pool_monitor", monitor or server.PoolMonitor(10))
+    monkeypatch.setitem(server.warmup_state, "complete", complete)
+    response = asyncio.run(server.readyz())
+    return response.status_code, orjson.loads(response.body)
+
+
+def test_pool_monitor_counts_connections_and_checkouts():
+    monitor = server.PoolMonitor(4)
+    monitor.pool_created(event())
+    for _ in range(3):
+        monitor.connection_created(event())
+    monitor.connection_closed(event())
+    for _ in range(3):
+        monitor.connection_check_out_started(event())
+    monitor.connection_checked_out(event())
+    monitor.connection_checked_out(event())
+    monitor.connection_check_out_failed(event())
+    monitor.connection_checked_in(event())
+
+    snapshot = monitor.snapshot()
+    assert snapshot["pools"] == 1
+    assert snapshot["open"] == 2
+    assert snapshot["checked_out"] == 1
+    assert snapshot["waiting"] == 0
+    assert snapshot["checkout_failures"] == 1
+    assert snapshot["saturation"] == pytest.approx(0.25)
+
+
+def test_pool_monitor_saturation_spans_all_pools():
+    monitor = server.PoolMonitor(2)
+    monitor.pool_created(event(("a", 27017)))
+    monitor.pool_created(event(("b", 27017)))
+    for _ in range(3):
+        monitor.connection_check_out_started(event())
+        monitor.connection_checked_out(event())
+    assert monitor.snapshot()["saturation"] == pytest.approx(0.75)
+
+    monitor.pool_closed(event(("b", 27017)))
+    assert monitor.snapshot()["pools"] == 1
+    assert monitor.snapshot()["saturation"] == pytest.approx(1.5)
+
+
+def test_readyz_ready(monkeypatch):
+    status, body = readyz(monkeypatch, FakeDatabase())
+    assert status == 200
+    assert body["status"] == "ready"
+    assert all(body["checks"].values())
+
+
+def test_readyz_not_ready_until_warm_up_completes(monkeypatch):
+    status, body = readyz(monkeypatch, FakeDatabase(), complete=False)
+    assert status == 503
+    assert body["checks"]["warmed_up"] is False
+
+
+def test_readyz_not_ready_when_mongo_unreachable(monkeypatch):
+    status, body = readyz(monkeypatch, FakeDatabase(fail=True))
+    assert status == 503
+    assert body["checks"]["mongo"] is False
+
+
+def test_readyz_not_ready_when_pool_saturated(monkeypatch):
+    monitor = server.PoolMonitor(2)
+    monitor.pool_created(event())
+    for _ in range(2):
+        monitor.connection_check_out_started(event())
+        monitor.connection_checked_out(event())
+    status, body = readyz(monkeypatch, FakeDatabase(), monitor=monitor)
+    assert status == 503
+    assert body["checks"]["pool_saturation"] is False
+
+
+def test_lifespan_does_not_wait_for_warm_up(monkeypatch):
+    released = asyncio.Event()
+
+    async def slow_warm_up():
+        await released.wait()
+
+    async def noop():
+        pass
+
+    async def run():
+        monkeypatch.setattr(server, "warm_up", slow_warm_up)
+        for recorder in (server.usage_recorder, server.reading_recorder, server.trace_recorder):
+            monkeypatch.setattr(recorder, "run", lambda interval: noop())
+            monkeypatch.setattr(recorder, "flush", noop)
+        monkeypatch.setattr(server.trace_recorder, "close", noop)
+        monkeypatch.setattr(server, "client", SimpleNamespace(close=lambda: None))
+        async with server.lifespan(server.app):
+            assert not released.is_set()
+
+    asyncio.run(asyncio.wait_for(run(), 1))
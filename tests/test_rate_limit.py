@@ -0,0 +1,53 @@
+import asyncio
+import math
+
+import server
+
+
+def take_many(backend, count, capacity, refill_per_second):
+    async def run():
+        return [await backend.take("user:route", capacity, refill_per_second) for _ in range(count)]
+    return asyncio.run(run())
+
+
+def test_bucket_allows_capacity_then_blocks():
+    results = take_many(server.InMemoryRateLimitBackend(), 5, capacity=3, refill_per_second=1.0)
+    assert results[:3] == [0.0, 0.0, 0.0]
+    assert all(0 < retry_after <= 1.0 for retry_after in results[3:])
+
+
+def test_fixed_quota_without_refill_blocks_forever():
+    results = take_many(server.InMemoryRateLimitBackend(), 5, capacity=2, refill_per_second=0.0)
+    assert results[:2] == [0.0, 0.0]
+    assert all(math.isinf(retry_after) for retry_after in results[2:])
+
+
+def test_limiter_blocks_fixed_quota():
+    limiter = server.TokenBucketLimiter(server.InMemoryRateLimitBackend(), capacity=2, refill_per_second=0.0)
+
+    async def run():
+        return [await limiter.take("user", "route") for _ in range(5)]
+
+    allowed = [retry_after == 0 for retry_after in asyncio.run(run())]
+    assert allowed == [True, True, False, False, False]
+
+
+def test_buckets_are_per_key():
+    backend = server.InMemoryRateLimitBackend()
+
+    async def run():
+        await backend.take("a:route", 1, 0.0)
+        return await backend.take("b:route", 1, 0.0)
+
+    assert asyncio.run(run()) == 0.0
+
+
+def test_least_recently_used_bucket_is_evicted():
+    backend = server.InMemoryRateLimitBackend(max_keys=2)
+
+    async def run():
+        for key in ("a", "b", "c"):
+            await backend.take(key, 1, 0.0)
+
+    asyncio.run(run())
+    assert list(backend.buckets) == ["b", "c"]
@@ -0,0 +1,62 @@
+from datetime import date
+
+import numpy as np
+
+import server
+
+BIRTH_DATE = date(1990, 5, 15)
+
+
+def features(zodiac_sign="Taurus", birth_date=BIRTH_DATE, birth_time="14:30"):
+    return server.chart_features(zodiac_sign, birth_date, birth_time)
+
+
+def similarity(first, second):
+    normalize = server.ReadingReuseCache.normalize
+    return float(normalize(first) @ normalize(second))
+
+
+def test_index_evicts_least_recently_used():
+    index = server.ReadingIndex(dimensions=2, capacity=2)
+    index.add(1, np.array([1.0, 0.0], dtype=np.float32), "a")
+    index.add(2, np.array([1.0, 0.0], dtype=np.float32), "b")
+    assert index.query(1, np.array([1.0, 0.0], dtype=np.float32), 0.9) == "a"
+
+    index.add(3, np.array([1.0, 0.0], dtype=np.float32), "c")
+
+    assert index.query(2, np.array([1.0, 0.0], dtype=np.float32), 0.9) is None
+    assert index.query(1, np.array([1.0, 0.0], dtype=np.float32), 0.9) == "a"
+    assert index.query(3, np.array([1.0, 0.0], dtype=np.float32), 0.9) == "c"
+
+
+def test_index_only_matches_within_bucket():
+    index = server.ReadingIndex(dimensions=2, capacity=4)
+    index.add(1, np.array([1.0, 0.0], dtype=np.float32), "a")
+    assert index.query(2, np.array([1.0, 0.0], dtype=np.float32), 0.0) is None
+
+
+def test_similarity_of_known_feature_pairs():
+    # Two hours apart: 30 degrees on the birth-time circle
+    assert similarity(features(), features(birth_time="16:30")) >= 0.98
+    # Six hours apart: 90 degrees
+    assert similarity(features(), features(birth_time="20:30")) < 0.98
+    # Neighbouring sign with a different element
+    assert similarity(features(), features("Gemini", date(1990, 5, 25))) < 0.6
+
+
+def test_cache_threshold_on_known_pairs(monkeypatch):
+    monkeypatch.setattr(server, "SEMANTIC_REUSE_ENABLED", True)
+    cache = server.ReadingReuseCache(threshold=0.98, capacity=10, disabled_routes={"friends_advice"})
+    bucket = server.birth_details_key(BIRTH_DATE, "New York, USA")
+    cache.add("horoscope_daily", bucket, features(), "reading")
+
+    assert cache.lookup("horoscope_daily", bucket, features(birth_time="15:30")) == "reading"
+    assert cache.lookup("horoscope_daily", bucket, features(birth_time="20:30")) is None
+    assert not cache.enabled_for("friends_advice")
+
+
+def test_bucket_separates_birth_year_and_place():
+    base = server.birth_details_key(BIRTH_DATE, "New York, USA")
+    assert server.birth_details_key(BIRTH_DATE, "  new york,   usa ") == base
+    assert server.birth_details_key(date(1975, 5, 15), "New York, USA") != base
+    assert server.birth_details_key(BIRTH_DATE, "Tokyo, Japan") != base
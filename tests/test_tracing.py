@@ -0,0 +1,49 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import server
+
+
+def make_client(monkeypatch):
+    recorder = server.TraceRecorder(exporter=None, slow_request_ms=0, slow_buffer_size=10)
+    monkeypatch.setattr(server, "trace_recorder", recorder)
+
+    app = FastAPI()
+
+    @app.get("/api/stream")
+    async def stream():
+        async def body():
+            for chunk in (b"a", b"b"):
+                await asyncio.sleep(0.05)
+                with server.span("chunk"):
+                    yield chunk
+        return StreamingResponse(body())
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    app.add_middleware(server.TracingMiddleware, prefix="/api")
+    return TestClient(app), recorder
+
+
+def test_streamed_response_is_timed_to_the_last_chunk(monkeypatch):
+    client, recorder = make_client(monkeypatch)
+    response = client.get("/api/stream")
+
+    (trace,) = recorder.slow_traces
+    assert response.headers["x-trace-id"] == trace["trace_id"]
+    assert trace["status_code"] == 200
+    assert trace["duration_ms"] >= 100
+    assert [span["name"] for span in trace["spans"]] == ["chunk", "chunk", "GET /api/stream"]
+
+
+def test_paths_outside_prefix_are_not_traced(monkeypatch):
+    client, recorder = make_client(monkeypatch)
+    response = client.get("/healthz")
+
+    assert "x-trace-id" not in response.headers
+    assert len(recorder.slow_traces) == 0
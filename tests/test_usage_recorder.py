@@ -0,0 +1,126 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import server
+
+
+class FakeCollection:
+    def __init__(self, fail_with=None):
+        self.fail_with = fail_with
+        self.inserted = []
+        self.operations = []
+
+    async def insert_many(self, documents, ordered=True):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.inserted.extend(documents)
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.operations.extend(operations)
+
+
+def use_db(monkeypatch, usage, usage_rollups):
+    monkeypatch.setattr(server, "db", SimpleNamespace(usage=usage, usage_rollups=usage_rollups))
+
+
+def record(recorder, route="horoscope_daily", latency_ms=10.0, success=True):
+    recorder.record("user", route, prompt_tokens=100, completion_tokens=50, latency_ms=latency_ms, success=success)
+
+
+def test_rollups_merge_calls_for_same_day_and_route():
+    recorder = server.UsageRecorder()
+    record(recorder, latency_ms=10.0)
+    record(recorder, latency_ms=30.0, success=False)
+    record(recorder, route="friends_advice")
+
+    assert len(recorder.rollups) == 2
+    (rollup,) = [value for (day, route), value in recorder.rollups.items() if route == "horoscope_daily"]
+    assert rollup == {
+        "calls": 2,
+        "errors": 1,
+        "prompt_tokens": 200,
+        "completion_tokens": 100,
+        "latency_ms_total": 40.0,
+        "latency_ms_max": 30.0
+    }
+
+
+def test_flush_writes_calls_and_rollups(monkeypatch):
+    usage, usage_rollups = FakeCollection(), FakeCollection()
+    use_db(monkeypatch, usage, usage_rollups)
+    recorder = server.UsageRecorder()
+    record(recorder)
+    record(recorder)
+
+    asyncio.run(recorder.flush())
+
+    assert len(usage.inserted) == 2
+    (operation,) = usage_rollups.operations
+    assert operation._doc["$inc"]["calls"] == 2
+    assert "latency_ms_max" not in operation._doc["$inc"]
+    assert recorder.pending == [] and recorder.rollups == {}
+
+
+def test_rollups_are_written_when_raw_insert_fails(monkeypatch):
+    usage, usage_rollups = FakeCollection(fail_with=AutoReconnect("down")), FakeCollection()
+    use_db(monkeypatch, usage, usage_rollups)
+    recorder = server.UsageRecorder()
+    record(recorder)
+
+    with pytest.raises(AutoReconnect):
+        asyncio.run(recorder.flush())
+
+    assert len(usage_rollups.operations) == 1
+    assert len(recorder.pending) == 1
+    assert recorder.rollups == {}
+
+
+def test_failed_rollups_merge_back_into_new_counts(monkeypatch):
+    usage, usage_rollups = FakeCollection(), FakeCollection(fail_with=AutoReconnect("down"))
+    use_db(monkeypatch, usage, usage_rollups)
+    recorder = server.UsageRecorder()
+    record(recorder, latency_ms=50.0)
+
+    with pytest.raises(AutoReconnect):
+        asyncio.run(recorder.flush())
+    record(recorder, latency_ms=10.0)
+
+    (rollup,) = recorder.rollups.values()
+    assert rollup["calls"] == 2
+    assert rollup["latency_ms_max"] == 50.0
+    assert len(usage.inserted) == 1
+
+
+def test_duplicate_key_errors_on_retry_are_not_requeued(monkeypatch):
+    error = BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]})
+    use_db(monkeypatch, FakeCollection(fail_with=error), FakeCollection())
+    recorder = server.UsageRecorder()
+    record(recorder)
+
+    asyncio.run(recorder.flush())
+
+    assert recorder.pending == []
+
+
+def test_requeue_is_bounded():
+    recorder = server.UsageRecorder(max_pending=3)
+    recorder.requeue([{"n": n} for n in range(5)])
+    assert recorder.pending == [{"n": 2}, {"n": 3}, {"n": 4}]
+
+
+def test_reading_recorder_flushes_to_readings(monkeypatch):
+    readings = FakeCollection()
+    monkeypatch.setattr(server, "db", SimpleNamespace(readings=readings))
+    monkeypatch.setattr(server, "STORE_READINGS", True)
+    recorder = server.ReadingRecorder(max_pending=10)
+    recorder.record("user", "horoscope_daily", server.AIResponse(content="text", tone="balanced"))
+
+    asyncio.run(recorder.flush())
+
+    assert [document["content"] for document in readings.inserted] == ["text"]
+    assert recorder.pending == []